@@ -1,18 +1,61 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.admission import AdaptiveConcurrencyLimiter
 from app.core.config import settings
+from app.core.exceptions import LoadSheddingError
+from app.core.loop_monitor import EventLoopMonitor
+from app.core.popularity import PopularityTracker
+from app.core.profiler import sample_stacks
+from app.core.tracing import mark, phase_summary, since_mark, span, start_trace
 from app.models.gateway_schemas import StateRequest, StateResponse
 from app.services.gateway import ExternalAPIClient
 from collections import defaultdict
-from datetime import datetime
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+import asyncio
+import math
+import secrets
 import time
 
+# Event-loop lag and slow-callback monitor
+loop_monitor = EventLoopMonitor(
+    interval=settings.LOOP_PROBE_INTERVAL_MS / 1000,
+    slow_threshold=settings.LOOP_SLOW_CALLBACK_MS / 1000,
+)
+
+
+async def probe_idle_upstreams():
+    """Actively probe upstreams only when live traffic has not exercised them."""
+    idle_after = settings.HEALTH_PROBE_IDLE_INTERVAL
+    while True:
+        await api_client.probe_idle_providers(idle_after)
+        await asyncio.sleep(idle_after / 10)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background monitors with the app and stop them on shutdown."""
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    prober = asyncio.create_task(probe_idle_upstreams())
+    yield
+    prober.cancel()
+    try:
+        # Let an in-flight probe unwind before the pooled clients close
+        await prober
+    except asyncio.CancelledError:
+        pass
+    await loop_monitor.stop()
+    await api_client.aclose()
+
+
 # Initialize FastAPI application
 app = FastAPI(
     title="API Gateway",
     description="Reverse-proxy-backed aggregation gateway for external APIs",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Metrics storage
@@ -21,10 +64,21 @@ metrics = {
     "successful_requests": 0,
     "failed_requests": 0,
     "average_response_time_ms": 0,
-    "requests_by_asset": defaultdict(int),
-    "requests_by_country": defaultdict(int),
     "cache_hits": 0,
-    "cache_misses": 0
+    "cache_misses": 0,
+    "shed_requests": 0,
+    "degraded_responses": 0
+}
+
+# Popularity tracking per request dimension - fixed memory, time-decayed
+popularity = {
+    section: PopularityTracker(
+        width=settings.POPULARITY_SKETCH_WIDTH,
+        depth=settings.POPULARITY_SKETCH_DEPTH,
+        top_k=settings.POPULARITY_TOP_K,
+        half_life=settings.POPULARITY_HALF_LIFE,
+    )
+    for section in ("economy", "weather", "air")
 }
 
 # Rate limiting storage
@@ -37,6 +91,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Poll-Interval"],
 )
 
 # Rate limiting middleware
@@ -64,11 +119,33 @@ async def rate_limit_middleware(request: Request, call_next):
         )
     
     rate_limits[client_ip].append(now)
+    since_mark("ratelimit")
+    mark()
     return await call_next(request)
 
+# Tracing middleware - registered last so it wraps rate limiting
+@app.middleware("http")
+async def tracing_middleware(request: Request, call_next):
+    """Time request phases and report them in a Server-Timing header."""
+    trace = start_trace()
+    response = await call_next(request)
+    if settings.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
 # Initialize external API client for aggregation
 api_client = ExternalAPIClient(timeout=10.0)
 
+# Adaptive concurrency limit in front of aggregation
+admission = AdaptiveConcurrencyLimiter(
+    initial_limit=settings.ADMISSION_INITIAL_LIMIT,
+    min_limit=settings.ADMISSION_MIN_LIMIT,
+    max_limit=settings.ADMISSION_MAX_LIMIT,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    latency_target_ms=settings.ADMISSION_LATENCY_TARGET_MS,
+)
+
 
 @app.get("/health")
 async def health_check():
@@ -79,33 +156,52 @@ async def health_check():
 @app.post("/state")
 async def get_state(request: StateRequest):
     """Main endpoint - aggregates external API data with metrics and timing."""
+    # Body parsing and pydantic validation ran since the rate limiter finished
+    since_mark("validate")
     start_time = time.time()
     metrics["total_requests"] += 1
     
     try:
         # Track request patterns
         if request.economy:
-            metrics["requests_by_asset"][request.economy.asset] += 1
+            popularity["economy"].add(request.economy.asset)
         if request.weather:
-            metrics["requests_by_country"][request.weather.country] += 1
+            popularity["weather"].add(request.weather.country)
+        if request.air:
+            popularity["air"].add(request.air.country)
         
         # Convert Pydantic model to dict for processing
         request_dict = {}
         
         if request.economy:
-            request_dict["economy"] = {"asset": request.economy.asset}
+            request_dict["economy"] = {"asset": request.economy.asset, "fields": request.economy.fields}
         
         if request.weather:
-            request_dict["weather"] = {"country": request.weather.country}
+            request_dict["weather"] = {"country": request.weather.country, "fields": request.weather.fields}
         
         if request.air:
-            request_dict["air"] = {"country": request.air.country}
+            request_dict["air"] = {"country": request.air.country, "fields": request.air.fields}
         
-        # Aggregate data from external APIs in parallel
-        aggregated_data = await api_client.aggregate_data(request_dict)
+        # Aggregate data from external APIs in parallel, subject to admission control
+        degraded = False
+        try:
+            async with admission.slot():
+                aggregated_data = await api_client.aggregate_data(request_dict)
+        except LoadSheddingError:
+            # Overloaded - serve whatever is cached, or shed with a fast 503
+            aggregated_data = api_client.aggregate_cached(request_dict)
+            if not aggregated_data:
+                metrics["shed_requests"] += 1
+                return JSONResponse(
+                    status_code=503,
+                    content={"error": "Service overloaded", "retry_after": settings.ADMISSION_RETRY_AFTER},
+                    headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)}
+                )
+            metrics["degraded_responses"] += 1
+            degraded = True
         
         # Track cache metrics
-        if api_client._last_was_cached:
+        if degraded or api_client._last_was_cached:
             metrics["cache_hits"] += 1
         else:
             metrics["cache_misses"] += 1
@@ -119,18 +215,38 @@ async def get_state(request: StateRequest):
             metrics["average_response_time_ms"] * 0.9 + duration_ms * 0.1
         )
         
+        # Polling hints - when each section's cache entry expires
+        now = datetime.now(timezone.utc)
+        next_updates = api_client.next_updates(request_dict)
+        seconds_left = {
+            key: max(0.0, (expires_at - now).total_seconds())
+            for key, expires_at in next_updates.items()
+        }
+        next_update_in = {key: round(seconds, 1) for key, seconds in seconds_left.items()}
+        # Round up so a client following the hint never polls just before the expiry
+        poll_interval = math.ceil(min(seconds_left.values(), default=settings.POLL_MIN_INTERVAL))
+        poll_interval = min(max(poll_interval, settings.POLL_MIN_INTERVAL), settings.POLL_MAX_INTERVAL)
+        
         # Add metadata to response
         response_data = {
             **aggregated_data,
             "_meta": {
                 "response_time_ms": round(duration_ms, 2),
                 "api_calls": len([k for k in request_dict.keys()]),
-                "cached": getattr(api_client, '_last_was_cached', False),
-                "timestamp": datetime.now().isoformat()
+                "cached": degraded or getattr(api_client, '_last_was_cached', False),
+                "degraded": degraded,
+                "timestamp": datetime.now().isoformat(),
+                "next_update": {key: expires_at.isoformat() for key, expires_at in next_updates.items()},
+                "next_update_in": next_update_in,
+                "poll_interval": poll_interval
             }
         }
         
-        return response_data
+        with span("serialize"):
+            return JSONResponse(
+                content=response_data,
+                headers={"X-Poll-Interval": str(poll_interval)}
+            )
         
     except Exception as e:
         metrics["failed_requests"] += 1
@@ -161,51 +277,65 @@ async def get_metrics():
             "misses": metrics["cache_misses"],
             "hit_rate": f"{cache_hit_rate:.1f}%"
         },
-        "popular_assets": dict(sorted(metrics["requests_by_asset"].items(), key=lambda x: x[1], reverse=True)[:5]),
-        "popular_countries": dict(sorted(metrics["requests_by_country"].items(), key=lambda x: x[1], reverse=True)[:5])
+        "admission": {
+            **admission.snapshot(),
+            "shed_requests": metrics["shed_requests"],
+            "degraded_responses": metrics["degraded_responses"]
+        },
+        "phases": phase_summary(),
+        "event_loop": loop_monitor.snapshot(),
+        "bulkheads": api_client.bulkhead_snapshot(),
+        "popular_assets": {k: round(v, 1) for k, v in popularity["economy"].top(5)},
+        "popular_countries": {k: round(v, 1) for k, v in popularity["weather"].top(5)},
+        "popular_air_countries": {k: round(v, 1) for k, v in popularity["air"].top(5)}
     }
 
 
 @app.get("/health/external")
 async def external_health():
-    """Check health of external API services."""
-    import httpx
-    from app.core.mappings import COINGECKO_API_URL, OPEN_METEO_WEATHER_URL
-    
-    results = {}
-    
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        # Test CoinGecko
-        try:
-            r = await client.get(f"{COINGECKO_API_URL}?ids=bitcoin&vs_currencies=usd")
-            results["coingecko"] = "healthy" if r.status_code == 200 else "degraded"
-        except Exception:
-            results["coingecko"] = "down"
-        
-        # Test Open-Meteo Weather
-        try:
-            r = await client.get(f"{OPEN_METEO_WEATHER_URL}?latitude=0&longitude=0&current=temperature_2m")
-            results["open_meteo_weather"] = "healthy" if r.status_code == 200 else "degraded"
-        except Exception:
-            results["open_meteo_weather"] = "down"
-        
-        # Test Open-Meteo Air Quality
-        try:
-            from app.core.mappings import OPEN_METEO_AIR_QUALITY_URL
-            r = await client.get(f"{OPEN_METEO_AIR_QUALITY_URL}?latitude=0&longitude=0&current=pm10")
-            results["open_meteo_air"] = "healthy" if r.status_code == 200 else "degraded"
-        except Exception:
-            results["open_meteo_air"] = "down"
-    
-    all_healthy = all(v == "healthy" for v in results.values())
+    """Report external API health derived passively from live fetch outcomes."""
+    details = api_client.health.snapshot()
+    results = {name: provider["status"] for name, provider in details.items()}
+    # Providers without samples yet have nothing to report - leave them out of the verdict
+    known = [v for v in results.values() if v != "unknown"]
+    if not known:
+        status = "unknown"
+    elif all(v == "healthy" for v in known):
+        status = "all systems operational"
+    else:
+        status = "degraded"
     
     return {
-        "status": "all systems operational" if all_healthy else "degraded",
+        "status": status,
         "services": results,
+        "details": details,
         "timestamp": datetime.now().isoformat()
     }
 
 
+_profile_lock = asyncio.Lock()
+
+
+@app.get("/debug/profile")
+async def debug_profile(request: Request, seconds: float = 5.0):
+    """Run the sampling profiler and return folded stacks for a flamegraph."""
+    token = settings.DEBUG_PROFILE_TOKEN
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(request.headers.get("X-Debug-Token", "").encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    seconds = min(max(seconds, 0.1), settings.PROFILE_MAX_SECONDS)
+    async with _profile_lock:
+        # Sample from a worker thread so the event loop keeps serving traffic
+        folded = await asyncio.to_thread(
+            sample_stacks, seconds, settings.PROFILE_INTERVAL_MS / 1000
+        )
+    return PlainTextResponse(folded)
+
+
 @app.get("/")
 async def root():
     """Root endpoint with service information."""
@@ -217,13 +347,18 @@ async def root():
             "POST /state": "Aggregate external API data",
             "GET /health": "Health check",
             "GET /health/external": "External API health status",
-            "GET /metrics": "API usage statistics"
+            "GET /metrics": "API usage statistics",
+            "GET /debug/profile": "On-demand sampling profiler (token protected)"
         },
         "features": [
             "Parallel API aggregation",
-            "Response caching (30s TTL)",
+            "Response caching (expiry follows upstream update cadence)",
             "Rate limiting (60 req/min)",
+            "Adaptive admission control with load shedding",
             "Real-time metrics",
+            "Per-phase Server-Timing headers",
+            "Server-driven polling hints",
+            "Per-upstream bulkheads with pooled connections",
             "External service monitoring"
         ],
         "note": "Access via NGINX at /api/state"
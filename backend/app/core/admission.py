@@ -0,0 +1,152 @@
+"""
+Adaptive admission control for the aggregation endpoint.
+Bounds in-flight /state work so slow upstreams cannot pile up coroutines and sockets.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from app.core.exceptions import LoadSheddingError
+from app.core.tracing import span
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limiter whose limit follows observed latency (AIMD).
+
+    A request that completes under the latency target while the limiter is
+    saturated grows the limit additively; a slow or failed request shrinks it
+    multiplicatively (at most once per latency window). Callers beyond the
+    limit wait in a bounded FIFO queue and are shed when the queue is full or
+    their wait exceeds ``queue_timeout``.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 20,
+        min_limit: int = 4,
+        max_limit: int = 200,
+        queue_size: int = 50,
+        queue_timeout: float = 1.0,
+        latency_target_ms: float = 1500.0,
+        backoff_ratio: float = 0.9,
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial_limit: Starting number of concurrent requests allowed
+            min_limit: Floor for the adaptive limit
+            max_limit: Ceiling for the adaptive limit
+            queue_size: Maximum number of requests waiting for a slot
+            queue_timeout: Maximum time a request may wait for a slot (seconds)
+            latency_target_ms: Latency above which the limit is decreased
+            backoff_ratio: Multiplier applied to the limit on decrease
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_target_ms = latency_target_ms
+        self.backoff_ratio = backoff_ratio
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._waiters: deque = deque()
+        self._last_decrease = 0.0
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    @property
+    def limit(self) -> int:
+        """Current integer concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def queued(self) -> int:
+        """Number of requests currently waiting for a slot."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one concurrency slot for the duration of the block.
+
+        Raises:
+            LoadSheddingError: If the queue is full or the wait times out
+        """
+        with span("admission"):
+            await self._acquire()
+        self.admitted += 1
+        start = time.perf_counter()
+        ok = False
+        cancelled = False
+        try:
+            yield
+            ok = True
+        except asyncio.CancelledError:
+            # A client disconnect says nothing about load, so don't adapt to it
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                self._record((time.perf_counter() - start) * 1000, ok)
+            self._release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return limiter state for the metrics endpoint."""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+    async def _acquire(self) -> None:
+        """Take a slot immediately, or wait in the bounded queue for one."""
+        if self.in_flight < self.limit and not self.queued:
+            self.in_flight += 1
+            return
+
+        if self.queued >= self.queue_size:
+            self.shed += 1
+            raise LoadSheddingError("Admission queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up - pass it on
+                self._release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            raise LoadSheddingError("Timed out waiting for admission") from None
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self) -> None:
+        """Free a slot and hand spare capacity to queued requests in FIFO order."""
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _record(self, latency_ms: float, ok: bool) -> None:
+        """Adjust the limit from one completed request (AIMD)."""
+        if not ok or latency_ms > self.latency_target_ms:
+            # Decrease at most once per latency window so a burst of slow
+            # responses from the same stall does not collapse the limit
+            now = time.monotonic()
+            if now - self._last_decrease >= self.latency_target_ms / 1000:
+                self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                self._last_decrease = now
+        elif self.in_flight >= self.limit:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
@@ -0,0 +1,80 @@
+"""
+Per-upstream bulkheads.
+Caps concurrent calls to one provider so a stalled upstream only consumes its
+own slice of tasks and sockets.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from app.core.exceptions import BulkheadFullError
+
+
+class Bulkhead:
+    """
+    Fixed concurrency limit with a bounded, time-limited wait queue.
+
+    Callers beyond ``max_concurrent`` wait for a slot; once ``max_queue``
+    callers are waiting, or a wait exceeds ``queue_timeout``, the call is
+    rejected with `BulkheadFullError` so the caller can fall back to cache.
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 10, max_queue: int = 20, queue_timeout: float = 2.0):
+        """
+        Initialize the bulkhead.
+
+        Args:
+            name: Provider name, used in errors and metrics
+            max_concurrent: Maximum simultaneous calls to the provider
+            max_queue: Maximum calls waiting for a slot
+            queue_timeout: Maximum time a call may wait for a slot (seconds)
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one of the provider's call slots for the duration of the block.
+
+        Raises:
+            BulkheadFullError: If the wait queue is full or the wait times out
+        """
+        if not self._semaphore.locked():
+            # Uncontended: acquire() returns without yielding to the loop
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise BulkheadFullError(f"{self.name} bulkhead queue is full")
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise BulkheadFullError(f"Timed out waiting for {self.name} bulkhead") from None
+            finally:
+                self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return bulkhead state for the metrics endpoint."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
@@ -29,6 +29,62 @@ class Settings(BaseSettings):
     # External API Timeout (seconds)
     API_TIMEOUT: int = 10
     
+    # Cache expiry per upstream source (seconds)
+    # Entries expire at the upstream's next expected update (observation time +
+    # update interval), clamped between the per-source min and max TTL
+    CACHE_ECONOMY_UPDATE_INTERVAL: int = 60
+    CACHE_ECONOMY_MIN_TTL: int = 30
+    CACHE_ECONOMY_MAX_TTL: int = 60
+    CACHE_WEATHER_UPDATE_INTERVAL: int = 900
+    CACHE_WEATHER_MIN_TTL: int = 30
+    CACHE_WEATHER_MAX_TTL: int = 900
+    CACHE_AIR_UPDATE_INTERVAL: int = 3600
+    CACHE_AIR_MIN_TTL: int = 60
+    CACHE_AIR_MAX_TTL: int = 3600
+    
+    # Client polling hints (seconds) - bounds for the recommended poll interval
+    POLL_MIN_INTERVAL: int = 5
+    POLL_MAX_INTERVAL: int = 900
+    
+    # Popularity tracking (count-min sketch + top-k, time-decayed)
+    POPULARITY_SKETCH_WIDTH: int = 1024
+    POPULARITY_SKETCH_DEPTH: int = 4
+    POPULARITY_TOP_K: int = 20
+    POPULARITY_HALF_LIFE: int = 3600
+    
+    # Admission control for /state (adaptive concurrency limit)
+    ADMISSION_INITIAL_LIMIT: int = 20
+    ADMISSION_MIN_LIMIT: int = 4
+    ADMISSION_MAX_LIMIT: int = 200
+    ADMISSION_QUEUE_SIZE: int = 50
+    ADMISSION_QUEUE_TIMEOUT: float = 1.0
+    ADMISSION_LATENCY_TARGET_MS: float = 1500.0
+    ADMISSION_RETRY_AFTER: int = 1
+    
+    # Request tracing (Server-Timing header and per-phase stats in /metrics)
+    SERVER_TIMING_ENABLED: bool = True
+    TRACE_PHASE_STATS: bool = True
+    
+    # On-demand sampling profiler at /debug/profile (disabled when token is empty)
+    DEBUG_PROFILE_TOKEN: str = ""
+    PROFILE_MAX_SECONDS: int = 30
+    PROFILE_INTERVAL_MS: float = 5.0
+    
+    # Per-upstream bulkheads - each provider gets its own slice of capacity
+    BULKHEAD_MAX_CONCURRENT: int = 10
+    BULKHEAD_MAX_QUEUE: int = 20
+    BULKHEAD_QUEUE_TIMEOUT: float = 2.0
+    UPSTREAM_MAX_CONNECTIONS: int = 10
+    UPSTREAM_MAX_KEEPALIVE: int = 5
+    
+    # Upstream health - providers idle for this long get an active probe (seconds)
+    HEALTH_PROBE_IDLE_INTERVAL: int = 300
+    
+    # Event-loop monitoring (lag histogram, slow-callback stack logging)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_PROBE_INTERVAL_MS: float = 100.0
+    LOOP_SLOW_CALLBACK_MS: float = 250.0
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
@@ -13,6 +13,16 @@ class ExternalAPIError(Exception):
     pass
 
 
+class LoadSheddingError(Exception):
+    """Exception raised when a request is rejected by admission control."""
+    pass
+
+
+class BulkheadFullError(Exception):
+    """Exception raised when an upstream provider's bulkhead has no capacity."""
+    pass
+
+
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors."""
     logger.error(f"Validation error: {exc.errors()}")
@@ -0,0 +1,158 @@
+"""
+Event-loop lag and slow-callback monitoring.
+Everything in the gateway shares one asyncio loop, so any blocking call stalls
+every in-flight request. This monitor measures scheduling lag continuously and
+logs the loop thread's stack whenever a callback blocks for too long.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+from app.core.logging import logger
+
+# Histogram bucket upper bounds for loop lag (milliseconds)
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class EventLoopMonitor:
+    """
+    Measures how late the event loop runs a scheduled wake-up.
+
+    A probe task sleeps for ``interval`` and records how much later than
+    requested it woke up. A watchdog thread keeps one ping queued on the loop
+    and, when the loop has not run it for ``slow_threshold``, logs the stack of
+    the loop thread - i.e. the callback that is blocking it.
+    """
+
+    def __init__(self, interval: float = 0.1, slow_threshold: float = 0.25):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Delay between lag probes (seconds)
+            slow_threshold: Blocking time after which the loop stack is logged (seconds)
+        """
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.slow_callbacks = 0
+        self.tasks = 0
+        self.max_tasks = 0
+        self._ping_sent: Optional[float] = None
+        self._stall_reported = False
+        self._loop_thread_id: Optional[int] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the probe task and watchdog thread. Must run on the event loop."""
+        if self._probe_task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._ping_sent = None
+        self._stop.clear()
+        self._probe_task = loop.create_task(self._probe())
+        self._watchdog = threading.Thread(
+            target=self._watch, args=(loop,), name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        self._stop.set()
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.slow_threshold)
+            self._watchdog = None
+
+    def record_lag(self, lag_ms: float) -> None:
+        """Add one lag sample to the histogram."""
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        for index, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                self.histogram[index] += 1
+                return
+        self.histogram[-1] += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Approximate a lag percentile (bucket upper bound, ms)."""
+        total = sum(self.histogram)
+        if total == 0:
+            return None
+        target = fraction * total
+        seen = 0
+        for index, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target:
+                return float(LAG_BUCKETS_MS[index]) if index < len(LAG_BUCKETS_MS) else self.max_lag_ms
+        return self.max_lag_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return monitor state for the metrics endpoint."""
+        buckets = [f"<={bound}ms" for bound in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}ms"]
+        return {
+            "lag_ms": {
+                "last": round(self.last_lag_ms, 2),
+                "max": round(self.max_lag_ms, 2),
+                "p50": self.percentile(0.5),
+                "p99": self.percentile(0.99),
+                "histogram": dict(zip(buckets, self.histogram)),
+            },
+            "slow_callbacks": self.slow_callbacks,
+            "tasks": {"current": self.tasks, "max": self.max_tasks},
+        }
+
+    async def _probe(self) -> None:
+        """Repeatedly sleep and record how late the loop woke us up."""
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(0.0, loop.time() - scheduled - self.interval) * 1000)
+            self.tasks = len(asyncio.all_tasks(loop))
+            self.max_tasks = max(self.max_tasks, self.tasks)
+
+    def _pong(self) -> None:
+        """Runs on the loop once it gets round to the watchdog's ping."""
+        self._ping_sent = None
+        self._stall_reported = False
+
+    def _watch(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Watchdog thread: log the loop thread's stack while it is blocked."""
+        # Timing the probe's wake-ups would hide up to one interval of blocking
+        # that overlaps its sleep; a ping queued on the loop measures the block
+        # itself, give or take one check
+        check_every = self.slow_threshold / 10
+        while not self._stop.wait(check_every):
+            now = time.monotonic()
+            if self._ping_sent is None:
+                self._ping_sent = now
+                try:
+                    loop.call_soon_threadsafe(self._pong)
+                except RuntimeError:  # loop closed under us
+                    return
+                continue
+            blocked_for = now - self._ping_sent
+            if blocked_for < self.slow_threshold or self._stall_reported:
+                continue
+            self._stall_reported = True
+            self.slow_callbacks += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>"
+            logger.warning(
+                f"Event loop blocked for {blocked_for * 1000:.0f}ms; loop thread stack:\n{stack}"
+            )
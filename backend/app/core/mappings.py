@@ -26,6 +26,83 @@ COUNTRY_COORDINATES = {
     "australia": {"latitude": -33.87, "longitude": 151.21},  # Sydney
 }
 
+# Weather fields served by the gateway
+# Maps response field names to Open-Meteo "current" variables.
+# Every weather fetch requests all of them in a single upstream call.
+WEATHER_FIELDS = {
+    "temperature": "temperature_2m",
+    "apparent_temperature": "apparent_temperature",
+    "humidity": "relative_humidity_2m",
+    "precipitation": "precipitation",
+    "cloud_cover": "cloud_cover",
+    "wind_speed": "wind_speed_10m",
+    "wind_direction": "wind_direction_10m",
+    "is_day": "is_day",
+    "condition": "weather_code",
+}
+
+# Air quality fields served by the gateway
+# Maps response field names to Open-Meteo air quality "current" variables
+AIR_QUALITY_FIELDS = {
+    "pm10": "pm10",
+    "pm2_5": "pm2_5",
+    "carbon_monoxide": "carbon_monoxide",
+    "nitrogen_dioxide": "nitrogen_dioxide",
+    "ozone": "ozone",
+    "european_aqi": "european_aqi",
+    "us_aqi": "us_aqi",
+}
+
+# Economy fields served by the gateway
+# CoinGecko simple/price keys; responses prefix them with the asset code (e.g. btc_usd)
+ECONOMY_FIELDS = ["usd", "usd_market_cap", "usd_24h_vol", "usd_24h_change"]
+
+# Fields returned when a request does not select any
+DEFAULT_FIELDS = {
+    "economy": ["usd"],
+    "weather": ["temperature", "wind_speed"],
+    "air": ["pm10"],
+}
+
+# WMO weather interpretation codes (Open-Meteo weather_code) to readable conditions
+WEATHER_CODE_CONDITIONS = {
+    0: "Clear",
+    1: "Mainly Clear",
+    2: "Partly Cloudy",
+    3: "Overcast",
+    45: "Fog",
+    48: "Fog",
+    51: "Drizzle",
+    53: "Drizzle",
+    55: "Drizzle",
+    56: "Freezing Drizzle",
+    57: "Freezing Drizzle",
+    61: "Rain",
+    63: "Rain",
+    65: "Heavy Rain",
+    66: "Freezing Rain",
+    67: "Freezing Rain",
+    71: "Snow",
+    73: "Snow",
+    75: "Heavy Snow",
+    77: "Snow Grains",
+    80: "Rain Showers",
+    81: "Rain Showers",
+    82: "Heavy Rain Showers",
+    85: "Snow Showers",
+    86: "Snow Showers",
+    95: "Thunderstorm",
+    96: "Thunderstorm",
+    99: "Thunderstorm",
+}
+
+# Upstream provider behind each response section
+PROVIDERS = {
+    "economy": "coingecko",
+    "weather": "open_meteo_weather",
+    "air": "open_meteo_air",
+}
+
 # External API endpoints
 COINGECKO_API_URL = "https://api.coingecko.com/api/v3/simple/price"
 OPEN_METEO_WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
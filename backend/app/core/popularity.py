@@ -0,0 +1,104 @@
+"""
+Bounded-memory popularity tracking.
+Count-min sketch plus a fixed-size heavy-hitters table, with exponential time decay.
+"""
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class PopularityTracker:
+    """
+    Approximate, time-decayed request counts for an unbounded key space.
+
+    Memory is fixed at ``width * depth`` sketch cells plus ``top_k`` tracked
+    keys regardless of how many distinct keys clients send. Updates cost
+    O(depth + top_k). Decay uses forward decay: each hit is weighted by
+    ``2 ** (age / half_life)`` relative to a landmark time, so old hits fade
+    without touching every counter; counters are rescaled only when the
+    weight grows large.
+    """
+
+    _RESCALE_THRESHOLD = 1e12
+
+    def __init__(
+        self,
+        width: int = 1024,
+        depth: int = 4,
+        top_k: int = 20,
+        half_life: float = 3600.0,
+        max_key_length: int = 64,
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            width: Counters per sketch row (controls over-estimation error)
+            depth: Number of sketch rows (controls error probability)
+            top_k: Number of heavy hitters kept with their keys
+            half_life: Time for a hit's weight to halve (seconds)
+            max_key_length: Keys are truncated to this many characters
+        """
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.half_life = half_life
+        self.max_key_length = max_key_length
+        self._rows: List[List[float]] = [[0.0] * width for _ in range(depth)]
+        self._top: Dict[str, float] = {}
+        self._landmark = time.monotonic()
+
+    def add(self, key: str, now: Optional[float] = None) -> None:
+        """Record one hit for ``key``."""
+        key = key.lower()[: self.max_key_length]
+        weight = self._weight(now)
+        if weight > self._RESCALE_THRESHOLD:
+            self._rescale(weight, now)
+            weight = 1.0
+
+        # Conservative update: only raise the cells that hold the minimum
+        cells = self._cells(key)
+        estimate = min(self._rows[row][col] for row, col in cells) + weight
+        for row, col in cells:
+            if self._rows[row][col] < estimate:
+                self._rows[row][col] = estimate
+
+        if key in self._top or len(self._top) < self.top_k:
+            self._top[key] = estimate
+            return
+        weakest = min(self._top, key=self._top.__getitem__)
+        if estimate > self._top[weakest]:
+            del self._top[weakest]
+            self._top[key] = estimate
+
+    def estimate(self, key: str, now: Optional[float] = None) -> float:
+        """Return the decayed hit count for ``key`` (never under-estimates)."""
+        key = key.lower()[: self.max_key_length]
+        raw = min(self._rows[row][col] for row, col in self._cells(key))
+        return raw / self._weight(now)
+
+    def top(self, n: int = 5, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Return the ``n`` most popular keys with their decayed counts."""
+        weight = self._weight(now)
+        ranked = sorted(self._top.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(key, count / weight) for key, count in ranked]
+
+    def _cells(self, key: str) -> List[Tuple[int, int]]:
+        """Sketch cell for ``key`` in each row (double hashing)."""
+        h1 = hash(key)
+        h2 = hash((key, "cms")) | 1
+        return [(row, (h1 + row * h2) % self.width) for row in range(self.depth)]
+
+    def _weight(self, now: Optional[float]) -> float:
+        """Forward-decay weight of a hit at ``now`` relative to the landmark."""
+        now = time.monotonic() if now is None else now
+        return math.pow(2.0, (now - self._landmark) / self.half_life)
+
+    def _rescale(self, weight: float, now: Optional[float]) -> None:
+        """Move the landmark to ``now`` so stored counters stay in float range."""
+        for row in self._rows:
+            for col in range(self.width):
+                row[col] /= weight
+        for key in self._top:
+            self._top[key] /= weight
+        self._landmark = time.monotonic() if now is None else now
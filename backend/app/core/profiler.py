@@ -0,0 +1,48 @@
+"""
+On-demand sampling profiler.
+Samples every thread's Python stack from a background thread and returns
+folded stacks ("frame;frame;frame count"), the input format of flamegraph.pl
+and speedscope.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+
+def _fold(frame) -> str:
+    """Render a frame chain root-first as a semicolon-separated stack."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sample all thread stacks for a period and return them in folded format.
+
+    Blocking - run it in a worker thread so the event loop keeps serving
+    (and keeps being sampled) while the profile is collected.
+
+    Args:
+        seconds: How long to sample for
+        interval: Delay between samples (seconds)
+    """
+    own_id = threading.get_ident()
+    thread_names: Dict[int, str] = {t.ident: t.name for t in threading.enumerate() if t.ident}
+    counts: Counter = Counter()
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            thread_name = thread_names.get(thread_id, str(thread_id))
+            counts[f"{thread_name};{_fold(frame)}"] += 1
+        time.sleep(interval)
+
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
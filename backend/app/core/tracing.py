@@ -0,0 +1,106 @@
+"""
+Lightweight per-request phase tracing.
+Collects span timings for a request and renders them as a Server-Timing header.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+class RequestTrace:
+    """Span timings collected while handling one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.checkpoint = self.start
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, duration_ms: float) -> None:
+        """Record a finished span."""
+        self.spans.append((name, duration_ms))
+
+    def server_timing(self) -> str:
+        """Render spans plus the total as a Server-Timing header value."""
+        total_ms = (time.perf_counter() - self.start) * 1000
+        entries = [f"{name};dur={duration:.2f}" for name, duration in self.spans]
+        entries.append(f"total;dur={total_ms:.2f}")
+        return ", ".join(entries)
+
+
+# Per-phase aggregates across requests: name -> count / total / max
+phase_stats: Dict[str, Dict[str, float]] = {}
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+
+def start_trace() -> RequestTrace:
+    """Begin tracing the current request."""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Return the trace for the current request, if any."""
+    return _current_trace.get()
+
+
+def _record(name: str, duration_ms: float) -> None:
+    """Attach a span to the current trace and fold it into phase stats."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.add(name, duration_ms)
+    if not settings.TRACE_PHASE_STATS:
+        return
+
+    stats = phase_stats.get(name)
+    if stats is None:
+        stats = phase_stats[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+    stats["count"] += 1
+    stats["total_ms"] += duration_ms
+    stats["max_ms"] = max(stats["max_ms"], duration_ms)
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a block of work as a named phase of the current request.
+
+    Span names must be fixed identifiers (never user input) so the Server-Timing
+    header stays well-formed and phase stats stay bounded.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, (time.perf_counter() - start) * 1000)
+
+
+def mark() -> None:
+    """Set the checkpoint used by `since_mark`."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.checkpoint = time.perf_counter()
+
+
+def since_mark(name: str) -> None:
+    """Record the time since the last checkpoint as a named phase."""
+    trace = _current_trace.get()
+    if trace is not None:
+        _record(name, (time.perf_counter() - trace.checkpoint) * 1000)
+
+
+def phase_summary() -> Dict[str, Dict[str, Any]]:
+    """Return per-phase averages for the metrics endpoint."""
+    return {
+        name: {
+            "count": int(stats["count"]),
+            "avg_ms": round(stats["total_ms"] / stats["count"], 2),
+            "max_ms": round(stats["max_ms"], 2),
+        }
+        for name, stats in phase_stats.items()
+    }
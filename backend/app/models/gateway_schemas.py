@@ -2,23 +2,32 @@
 Pydantic models for the API gateway.
 Defines request and response schemas for the /api/state endpoint.
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 
 
 class EconomyRequest(BaseModel):
     """Request parameters for economy data."""
     asset: str = Field(..., description="Cryptocurrency asset code (btc, eth, sol)")
+    fields: Optional[List[str]] = Field(
+        None, description="Fields to return, e.g. usd, usd_24h_change, observed_at (default: usd)"
+    )
 
 
 class WeatherRequest(BaseModel):
     """Request parameters for weather data."""
     country: str = Field(..., description="Country name")
+    fields: Optional[List[str]] = Field(
+        None, description="Fields to return, e.g. humidity, condition, observed_at (default: temperature, wind_speed)"
+    )
 
 
 class AirQualityRequest(BaseModel):
     """Request parameters for air quality data."""
     country: str = Field(..., description="Country name")
+    fields: Optional[List[str]] = Field(
+        None, description="Fields to return, e.g. pm2_5, us_aqi, observed_at (default: pm10)"
+    )
 
 
 class StateRequest(BaseModel):
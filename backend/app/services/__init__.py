@@ -1,6 +1,8 @@
 """Service layer business logic."""
 from app.services.gateway import ExternalAPIClient
+from app.services.health import UpstreamHealth
 
 __all__ = [
-    "ExternalAPIClient"
+    "ExternalAPIClient",
+    "UpstreamHealth"
 ]
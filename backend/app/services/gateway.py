@@ -3,17 +3,47 @@ External API client for aggregating data from multiple sources.
 This module handles all external API calls and data normalization.
 """
 import asyncio
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta, timezone
 import httpx
+from app.core.config import settings
 from app.core.mappings import (
+    AIR_QUALITY_FIELDS,
     ASSET_MAPPING,
     COUNTRY_COORDINATES,
+    DEFAULT_FIELDS,
+    ECONOMY_FIELDS,
+    WEATHER_CODE_CONDITIONS,
+    WEATHER_FIELDS,
     COINGECKO_API_URL,
     OPEN_METEO_WEATHER_URL,
     OPEN_METEO_AIR_QUALITY_URL,
+    PROVIDERS,
 )
-from app.core.exceptions import ExternalAPIError
+from app.core.bulkhead import Bulkhead
+from app.core.exceptions import BulkheadFullError, ExternalAPIError
+from app.core.tracing import span
+from app.services.health import UpstreamHealth
+
+
+class UpstreamCall:
+    """
+    One upstream call made while holding a bulkhead slot.
+    
+    Fetchers set ``ok`` once the response has been parsed into usable data;
+    the outcome is recorded in passive health when the call finishes.
+    """
+    
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.ok = False
+        self.start = time.perf_counter()
+    
+    def elapsed_ms(self) -> float:
+        """Time since the slot was acquired (milliseconds)."""
+        return (time.perf_counter() - self.start) * 1000
 
 
 class ExternalAPIClient:
@@ -28,12 +58,90 @@ class ExternalAPIClient:
         
         Args:
             timeout: Maximum time to wait for external API responses (seconds)
-            cache_duration: How long to cache responses (seconds)
+            cache_duration: Fallback TTL when the upstream reports no observation time (seconds)
         """
         self.timeout = timeout
         self.cache_duration = cache_duration
+        # Per-source (update interval, min TTL, max TTL) in seconds
+        self.cache_policies = {
+            "economy": (
+                settings.CACHE_ECONOMY_UPDATE_INTERVAL,
+                settings.CACHE_ECONOMY_MIN_TTL,
+                settings.CACHE_ECONOMY_MAX_TTL,
+            ),
+            "weather": (
+                settings.CACHE_WEATHER_UPDATE_INTERVAL,
+                settings.CACHE_WEATHER_MIN_TTL,
+                settings.CACHE_WEATHER_MAX_TTL,
+            ),
+            "air": (
+                settings.CACHE_AIR_UPDATE_INTERVAL,
+                settings.CACHE_AIR_MIN_TTL,
+                settings.CACHE_AIR_MAX_TTL,
+            ),
+        }
         self._cache = {}
         self._last_was_cached = False
+        # Passive upstream health, fed by every fetch
+        self.health = UpstreamHealth(PROVIDERS.values())
+        # Per-provider bulkheads and pooled HTTP clients
+        self.bulkheads = {
+            name: Bulkhead(
+                name,
+                max_concurrent=settings.BULKHEAD_MAX_CONCURRENT,
+                max_queue=settings.BULKHEAD_MAX_QUEUE,
+                queue_timeout=settings.BULKHEAD_QUEUE_TIMEOUT,
+            )
+            for name in PROVIDERS.values()
+        }
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+    
+    def _http_client(self, provider: str) -> httpx.AsyncClient:
+        """Return the provider's pooled HTTP client, creating it on first use."""
+        client = self._http_clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE,
+                ),
+            )
+            self._http_clients[provider] = client
+        return client
+    
+    @asynccontextmanager
+    async def _upstream(self, section: str):
+        """
+        Borrow the section's provider client inside its bulkhead.
+        
+        Time spent waiting for a bulkhead slot is traced as <section>_bulkhead;
+        the upstream span and the call's latency start only once a slot is held.
+        Exactly one outcome per call is recorded in passive health.
+        """
+        provider = PROVIDERS[section]
+        async with AsyncExitStack() as stack:
+            with span(f"{section}_bulkhead"):
+                await stack.enter_async_context(self.bulkheads[provider].slot())
+            call = UpstreamCall(self._http_client(provider))
+            try:
+                with span(f"{section}_upstream"):
+                    yield call
+            except asyncio.CancelledError:
+                # Cancelled by our caller - says nothing about the provider
+                raise
+            except Exception:
+                self.health.record(provider, False, call.elapsed_ms())
+                raise
+            else:
+                # One outcome per call: a response without usable data is a failure
+                self.health.record(provider, call.ok, call.elapsed_ms())
+    
+    async def aclose(self) -> None:
+        """Close pooled HTTP connections."""
+        for client in self._http_clients.values():
+            await client.aclose()
+        self._http_clients.clear()
     
     async def fetch_economy_data(self, asset: str) -> Optional[Dict[str, Any]]:
 
@@ -43,25 +151,35 @@ class ExternalAPIClient:
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # Call CoinGecko API to get current price in USD
-                response = await client.get(
+            async with self._upstream("economy") as call:
+                # Call CoinGecko API once for every price field we serve
+                response = await call.client.get(
                     COINGECKO_API_URL,
                     params={
                         "ids": coin_id,
-                        "vs_currencies": "usd"
+                        "vs_currencies": "usd",
+                        "include_market_cap": "true",
+                        "include_24hr_vol": "true",
+                        "include_24hr_change": "true",
+                        "include_last_updated_at": "true"
                     }
                 )
                 response.raise_for_status()
                 data = response.json()
-                
-                # Extract and normalize the price value
+            
+                # Extract and normalize the price values
                 if coin_id in data and "usd" in data[coin_id]:
-                    price = data[coin_id]["usd"]
-                    return {f"{asset.lower()}_usd": price}
-                
+                    prices = data[coin_id]
+                    economy = {
+                        f"{asset.lower()}_{field}": prices.get(field)
+                        for field in ECONOMY_FIELDS
+                    }
+                    economy["observed_at"] = self._to_iso(prices.get("last_updated_at"))
+                    call.ok = True
+                    return economy
+            
                 return None
-                
+            
         except (httpx.HTTPError, KeyError, ValueError) as e:
             # Log error but don't fail the entire request
             print(f"Economy API error for {asset}: {str(e)}")
@@ -75,29 +193,35 @@ class ExternalAPIClient:
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # Call Open-Meteo weather API with coordinates
-                response = await client.get(
+            async with self._upstream("weather") as call:
+                # Call Open-Meteo weather API once for every field we serve
+                response = await call.client.get(
                     OPEN_METEO_WEATHER_URL,
                     params={
                         "latitude": coords["latitude"],
                         "longitude": coords["longitude"],
-                        "current_weather": "true"
+                        "current": ",".join(WEATHER_FIELDS.values())
                     }
                 )
                 response.raise_for_status()
                 data = response.json()
-                
+            
                 # Extract and normalize weather values
-                if "current_weather" in data:
-                    current = data["current_weather"]
-                    return {
-                        "temperature": current.get("temperature"),
-                        "wind_speed": current.get("windspeed")
+                if "current" in data:
+                    current = data["current"]
+                    weather = {
+                        field: current.get(variable)
+                        for field, variable in WEATHER_FIELDS.items()
                     }
-                
+                    weather["condition"] = WEATHER_CODE_CONDITIONS.get(
+                        weather["condition"], "Unknown"
+                    )
+                    weather["observed_at"] = self._to_iso(current.get("time"))
+                    call.ok = True
+                    return weather
+            
                 return None
-                
+            
         except (httpx.HTTPError, KeyError, ValueError) as e:
             print(f"Weather API error for {country}: {str(e)}")
             return None
@@ -110,82 +234,206 @@ class ExternalAPIClient:
             return None
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # Call Open-Meteo air quality API with coordinates
-                response = await client.get(
+            async with self._upstream("air") as call:
+                # Call Open-Meteo air quality API once for every field we serve
+                response = await call.client.get(
                     OPEN_METEO_AIR_QUALITY_URL,
                     params={
                         "latitude": coords["latitude"],
                         "longitude": coords["longitude"],
-                        "current": "pm10"
+                        "current": ",".join(AIR_QUALITY_FIELDS.values())
                     }
                 )
                 response.raise_for_status()
                 data = response.json()
-                
+            
                 # Extract and normalize air quality values
                 if "current" in data and "pm10" in data["current"]:
-                    return {
-                        "pm10": data["current"]["pm10"]
+                    current = data["current"]
+                    air = {
+                        field: current.get(variable)
+                        for field, variable in AIR_QUALITY_FIELDS.items()
                     }
-                
+                    air["observed_at"] = self._to_iso(current.get("time"))
+                    call.ok = True
+                    return air
+            
                 return None
-                
+            
         except (httpx.HTTPError, KeyError, ValueError) as e:
             print(f"Air quality API error for {country}: {str(e)}")
             return None
     
     
-    def _get_cache_key(self, prefix: str, identifier: str) -> str:
-        """Generate cache key."""
-        return f"{prefix}:{identifier}"
+    def _get_cache_key(self, prefix: str, identifier: str, field: str) -> str:
+        """Generate cache key for one field of one location or asset."""
+        return f"{prefix}:{identifier.lower()}:{field}"
     
-    def _is_cache_valid(self, timestamp: datetime) -> bool:
+    def _is_cache_valid(self, expires_at: datetime) -> bool:
         """Check if cached data is still valid."""
-        return datetime.now() - timestamp < timedelta(seconds=self.cache_duration)
-    
-    async def _get_cached_or_fetch(self, cache_key: str, fetch_func):
-        """Get from cache or fetch fresh data."""
-        # Check cache first
-        if cache_key in self._cache:
-            data, timestamp = self._cache[cache_key]
-            if self._is_cache_valid(timestamp):
+        return datetime.now(timezone.utc) < expires_at
+    
+    @staticmethod
+    def _to_iso(observed) -> Optional[str]:
+        """Normalize an upstream observation time to an ISO-8601 UTC string."""
+        if observed is None:
+            return None
+        if isinstance(observed, (int, float)):
+            # CoinGecko last_updated_at is a Unix timestamp
+            return datetime.fromtimestamp(observed, tz=timezone.utc).isoformat()
+        # Open-Meteo times are GMT without an offset, e.g. "2025-01-01T12:15"
+        parsed = datetime.fromisoformat(observed)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.isoformat()
+    
+    def _expiry_for(self, prefix: str, observed_at: Optional[str]) -> datetime:
+        """
+        Compute when a fresh fetch can return newer data.
+        
+        Expiry is the upstream's next expected update (observation time plus its
+        update interval), clamped to the source's min/max TTL. Without an
+        observation time the flat cache_duration is used.
+        """
+        interval, min_ttl, max_ttl = self.cache_policies[prefix]
+        ttl = float(self.cache_duration)
+        if observed_at:
+            next_update = datetime.fromisoformat(observed_at) + timedelta(seconds=interval)
+            ttl = (next_update - datetime.now(timezone.utc)).total_seconds()
+        ttl = min(max(ttl, min_ttl), max_ttl)
+        return datetime.now(timezone.utc) + timedelta(seconds=ttl)
+    
+    def _select_fields(self, section: str, identifier: str, fields: Optional[List[str]]) -> List[str]:
+        """Resolve requested field names to response keys, falling back to defaults."""
+        if section == "economy":
+            known = [f for f in (fields or []) if f in ECONOMY_FIELDS] or DEFAULT_FIELDS[section]
+            keys = [f"{identifier.lower()}_{field}" for field in known]
+        else:
+            available = WEATHER_FIELDS if section == "weather" else AIR_QUALITY_FIELDS
+            keys = [f for f in (fields or []) if f in available] or DEFAULT_FIELDS[section]
+        if fields and "observed_at" in fields:
+            keys = keys + ["observed_at"]
+        return keys
+    
+    async def _get_cached_or_fetch(
+        self, prefix: str, identifier: str, keys: List[str], fetch_func, track_cached: bool = True
+    ):
+        """
+        Get the requested fields from cache, or fetch the full superset once.
+        
+        With ``track_cached`` off (background probes) the lookup leaves
+        ``_last_was_cached`` alone, so it cannot skew a concurrent request's
+        cached flag or the hit/miss metrics.
+        """
+        # Check cache first - every requested field must be present and fresh
+        with span("cache"):
+            entries = [self._cache.get(self._get_cache_key(prefix, identifier, key)) for key in keys]
+        if all(entry is not None and self._is_cache_valid(entry[1]) for entry in entries):
+            if track_cached:
                 self._last_was_cached = True
-                return data
+            return {key: entry[0] for key, entry in zip(keys, entries)}
         
-        # Cache miss or expired - fetch fresh data
-        self._last_was_cached = False
-        data = await fetch_func()
-        if data is not None:
-            self._cache[cache_key] = (data, datetime.now())
-        return data
+        # Cache miss or expired - fetch fresh data and cache every field it carries
+        if track_cached:
+            self._last_was_cached = False
+        try:
+            data = await fetch_func()
+        except BulkheadFullError:
+            # Provider is saturated - serve whatever is cached, however old
+            stale = {key: entry[0] for key, entry in zip(keys, entries) if entry is not None}
+            if track_cached:
+                self._last_was_cached = bool(stale)
+            return stale or None
+        if data is None:
+            return None
+        expires_at = self._expiry_for(prefix, data.get("observed_at"))
+        for key, value in data.items():
+            self._cache[self._get_cache_key(prefix, identifier, key)] = (value, expires_at)
+        return {key: data.get(key) for key in keys}
+    
+    def aggregate_cached(self, request_data: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Build a response from cached entries only, ignoring TTL (degraded mode)."""
+        response = {}
+        for key, id_field, _ in self._sources():
+            if key in request_data and id_field in request_data[key]:
+                identifier = request_data[key][id_field]
+                section = {}
+                for field in self._select_fields(key, identifier, request_data[key].get("fields")):
+                    cache_key = self._get_cache_key(key, identifier, field)
+                    if cache_key in self._cache:
+                        section[field] = self._cache[cache_key][0]
+                if section:
+                    response[key] = section
+        return response
+    
+    def next_updates(self, request_data: Dict[str, Dict[str, Any]]) -> Dict[str, datetime]:
+        """Return, per requested section, when its cached fields are next expected to change."""
+        updates = {}
+        for key, id_field, _ in self._sources():
+            if key in request_data and id_field in request_data[key]:
+                identifier = request_data[key][id_field]
+                fields = self._select_fields(key, identifier, request_data[key].get("fields"))
+                expiries = [
+                    entry[1]
+                    for entry in (
+                        self._cache.get(self._get_cache_key(key, identifier, field)) for field in fields
+                    )
+                    if entry is not None and entry[1] is not None
+                ]
+                if expiries:
+                    updates[key] = min(expiries)
+        return updates
+    
+    async def probe_idle_providers(self, idle_after: float) -> None:
+        """
+        Actively probe only the providers that have seen no traffic recently.
+        
+        Probes go through the cache like live requests: a probe warms the cache,
+        and a provider whose data is still cached is not called at all.
+        """
+        probe_targets = {"economy": "btc", "weather": "algeria", "air": "algeria"}
+        idle = set(self.health.idle_providers(idle_after))
+        probes = [
+            self._get_cached_or_fetch(
+                key,
+                probe_targets[key],
+                self._select_fields(key, probe_targets[key], None),
+                lambda f=fetcher, i=probe_targets[key]: f(i),
+                track_cached=False,
+            )
+            for key, _, fetcher in self._sources()
+            if PROVIDERS[key] in idle
+        ]
+        # Fetchers record their own outcome in self.health
+        await asyncio.gather(*probes, return_exceptions=True)
+    
+    def bulkhead_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-provider bulkhead state for the metrics endpoint."""
+        return {name: bulkhead.snapshot() for name, bulkhead in self.bulkheads.items()}
+    
+    def _sources(self):
+        """Sections served by the gateway: (name, identifier field, fetcher)."""
+        return (
+            ("economy", "asset", self.fetch_economy_data),
+            ("weather", "country", self.fetch_weather_data),
+            ("air", "country", self.fetch_air_quality_data),
+        )
     
-    async def aggregate_data(self, request_data: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+    async def aggregate_data(self, request_data: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
         """Aggregate data from external APIs with caching support."""
         # Build list of async tasks for parallel execution
         tasks = []
         task_keys = []
         
-        # Check if economy data is requested
-        if "economy" in request_data and "asset" in request_data["economy"]:
-            asset = request_data["economy"]["asset"]
-            cache_key = self._get_cache_key("economy", asset)
-            tasks.append(self._get_cached_or_fetch(cache_key, lambda a=asset: self.fetch_economy_data(a)))
-            task_keys.append("economy")
-        
-        # Check if weather data is requested
-        if "weather" in request_data and "country" in request_data["weather"]:
-            country = request_data["weather"]["country"]
-            cache_key = self._get_cache_key("weather", country)
-            tasks.append(self._get_cached_or_fetch(cache_key, lambda c=country: self.fetch_weather_data(c)))
-            task_keys.append("weather")
-        
-        # Check if air quality data is requested
-        if "air" in request_data and "country" in request_data["air"]:
-            country = request_data["air"]["country"]
-            cache_key = self._get_cache_key("air", country)
-            tasks.append(self._get_cached_or_fetch(cache_key, lambda c=country: self.fetch_air_quality_data(c)))
-            task_keys.append("air")
+        # One task per requested section; each fetch pulls the provider's full field set
+        for key, id_field, fetcher in self._sources():
+            if key in request_data and id_field in request_data[key]:
+                identifier = request_data[key][id_field]
+                fields = self._select_fields(key, identifier, request_data[key].get("fields"))
+                tasks.append(self._get_cached_or_fetch(
+                    key, identifier, fields, lambda f=fetcher, i=identifier: f(i)
+                ))
+                task_keys.append(key)
         
         # Execute all API calls in parallel for optimal performance
         results = await asyncio.gather(*tasks, return_exceptions=True)
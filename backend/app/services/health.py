@@ -0,0 +1,97 @@
+"""
+Passive upstream health tracking.
+Derives provider health from the outcomes of live fetches instead of probing.
+"""
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class ProviderStats:
+    """Rolling window of fetch outcomes for one upstream provider."""
+
+    def __init__(self, window: int):
+        self.outcomes: deque = deque(maxlen=window)  # (ok, latency_ms)
+        self.last_seen: Optional[float] = None
+        self.last_success: Optional[datetime] = None
+        self.last_failure: Optional[datetime] = None
+
+
+class UpstreamHealth:
+    """
+    Per-provider success rate, latency percentiles and last-success time.
+
+    Fetchers report every upstream call via `record`; the health endpoint then
+    answers from memory. Providers that see no traffic for a while can be
+    listed with `idle_providers` so only they are actively probed.
+    """
+
+    def __init__(self, providers: Iterable[str], window: int = 100):
+        """
+        Initialize the tracker.
+
+        Args:
+            providers: Names of the upstream providers to track
+            window: Number of recent outcomes kept per provider
+        """
+        self._stats: Dict[str, ProviderStats] = {name: ProviderStats(window) for name in providers}
+
+    def record(self, provider: str, ok: bool, latency_ms: float) -> None:
+        """Record the outcome of one upstream call."""
+        stats = self._stats[provider]
+        stats.outcomes.append((ok, latency_ms))
+        stats.last_seen = time.monotonic()
+        if ok:
+            stats.last_success = datetime.now()
+        else:
+            stats.last_failure = datetime.now()
+
+    def idle_providers(self, idle_after: float) -> List[str]:
+        """Return providers with no upstream call in the last ``idle_after`` seconds."""
+        now = time.monotonic()
+        return [
+            name
+            for name, stats in self._stats.items()
+            if stats.last_seen is None or now - stats.last_seen >= idle_after
+        ]
+
+    def status(self, provider: str) -> str:
+        """Classify a provider as healthy, degraded, down or unknown."""
+        outcomes = self._stats[provider].outcomes
+        if not outcomes:
+            return "unknown"
+        success_rate = sum(1 for ok, _ in outcomes if ok) / len(outcomes)
+        if success_rate >= 0.9:
+            return "healthy"
+        return "degraded" if success_rate > 0 else "down"
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return per-provider health details."""
+        return {name: self._describe(name, stats) for name, stats in self._stats.items()}
+
+    def _describe(self, name: str, stats: ProviderStats) -> Dict[str, Any]:
+        """Summarize one provider's rolling window."""
+        outcomes = stats.outcomes
+        latencies = sorted(latency for _, latency in outcomes)
+        successes = sum(1 for ok, _ in outcomes if ok)
+        return {
+            "status": self.status(name),
+            "samples": len(outcomes),
+            "success_rate": round(successes / len(outcomes), 3) if outcomes else None,
+            "latency_ms": {
+                "p50": self._percentile(latencies, 0.5),
+                "p95": self._percentile(latencies, 0.95),
+                "p99": self._percentile(latencies, 0.99),
+            },
+            "last_success": stats.last_success.isoformat() if stats.last_success else None,
+            "last_failure": stats.last_failure.isoformat() if stats.last_failure else None,
+        }
+
+    @staticmethod
+    def _percentile(values: List[float], fraction: float) -> Optional[float]:
+        """Nearest-rank percentile of pre-sorted values."""
+        if not values:
+            return None
+        index = min(len(values) - 1, int(fraction * len(values)))
+        return round(values[index], 2)
@@ -0,0 +1,114 @@
+"""
+Tests for adaptive admission control.
+"""
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api import gateway_service
+from app.core.admission import AdaptiveConcurrencyLimiter
+from app.core.exceptions import LoadSheddingError
+
+
+@pytest.mark.asyncio
+async def test_limiter_sheds_when_queue_full():
+    """Requests beyond limit + queue are rejected immediately."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, queue_size=1, queue_timeout=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    assert limiter.in_flight == 1
+    assert limiter.queued == 1
+
+    with pytest.raises(LoadSheddingError):
+        async with limiter.slot():
+            pass
+    assert limiter.shed == 1
+
+    release.set()
+    await asyncio.gather(holder, queued)
+    assert limiter.in_flight == 0
+    assert limiter.admitted == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue_timeout():
+    """A queued request is shed once its wait exceeds the queue timeout."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, queue_size=5, queue_timeout=0.01)
+    async with limiter.slot():
+        with pytest.raises(LoadSheddingError):
+            async with limiter.slot():
+                pass
+    assert limiter.in_flight == 0
+    assert limiter.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_aimd_adjusts_limit():
+    """Slow requests shrink the limit; fast saturated requests grow it."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, max_limit=20, latency_target_ms=100)
+    limiter._record(500, ok=True)
+    assert limiter.limit == 9
+
+    limiter.in_flight = limiter.limit
+    before = limiter._limit
+    limiter._record(1, ok=True)
+    assert limiter._limit > before
+
+
+@pytest.mark.asyncio
+async def test_limiter_ignores_cancelled_requests():
+    """A cancelled request frees its slot without shrinking the limit."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=10, min_limit=2, latency_target_ms=100)
+
+    async def hold():
+        async with limiter.slot():
+            await asyncio.Event().wait()
+
+    task = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    assert limiter.in_flight == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert limiter.limit == 10
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_state_sheds_with_retry_after(monkeypatch):
+    """An overloaded /state with nothing cached returns 503 with Retry-After."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, queue_size=0)
+    limiter.in_flight = 1
+    monkeypatch.setattr(gateway_service, "admission", limiter)
+
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/state", json={"economy": {"asset": "not-cached"}})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+@pytest.mark.asyncio
+async def test_state_serves_cache_when_overloaded(monkeypatch):
+    """An overloaded /state with cached data returns a degraded response."""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, queue_size=0)
+    limiter.in_flight = 1
+    monkeypatch.setattr(gateway_service, "admission", limiter)
+    monkeypatch.setitem(gateway_service.api_client._cache, "economy:btc:btc_usd", (1.0, None))
+
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/state", json={"economy": {"asset": "btc"}})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["economy"] == {"btc_usd": 1.0}
+    assert data["_meta"]["degraded"] is True
@@ -0,0 +1,114 @@
+"""
+Tests for per-upstream bulkheads.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.bulkhead import Bulkhead
+from app.core.exceptions import BulkheadFullError
+from app.services.gateway import ExternalAPIClient
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_rejects_when_queue_full():
+    """Calls beyond the concurrency cap and queue are rejected at once."""
+    bulkhead = Bulkhead("open_meteo_air", max_concurrent=1, max_queue=0, queue_timeout=1.0)
+    async with bulkhead.slot():
+        with pytest.raises(BulkheadFullError):
+            async with bulkhead.slot():
+                pass
+    assert bulkhead.rejected == 1
+    assert bulkhead.active == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_queue_timeout():
+    """A queued call gives up after the queue timeout."""
+    bulkhead = Bulkhead("open_meteo_air", max_concurrent=1, max_queue=5, queue_timeout=0.01)
+    async with bulkhead.slot():
+        with pytest.raises(BulkheadFullError):
+            async with bulkhead.slot():
+                pass
+    assert bulkhead.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_burst_respects_queue_limit():
+    """A simultaneous burst fills the slots and queue, and the rest is rejected."""
+    bulkhead = Bulkhead("coingecko", max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    release = asyncio.Event()
+
+    async def call():
+        async with bulkhead.slot():
+            await release.wait()
+
+    tasks = [asyncio.create_task(call()) for _ in range(3)]
+    await asyncio.sleep(0)
+    try:
+        assert (bulkhead.active, bulkhead.waiting, bulkhead.rejected) == (1, 1, 1)
+    finally:
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert sum(isinstance(result, BulkheadFullError) for result in results) == 1
+    assert bulkhead.active == 0
+
+
+@pytest.mark.asyncio
+async def test_saturated_provider_does_not_delay_others(monkeypatch):
+    """A stalled air-quality upstream serves stale cache while economy stays fast."""
+    client = ExternalAPIClient()
+    client.bulkheads["open_meteo_air"] = Bulkhead(
+        "open_meteo_air", max_concurrent=1, max_queue=0, queue_timeout=0.01
+    )
+    stall = asyncio.Event()
+
+    async def stalled_air(country):
+        async with client._upstream("air"):
+            await stall.wait()
+
+    async def fast_economy(asset):
+        async with client._upstream("economy"):
+            return {"btc_usd": 100.0}
+
+    monkeypatch.setattr(client, "fetch_air_quality_data", stalled_air)
+    monkeypatch.setattr(client, "fetch_economy_data", fast_economy)
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    client._cache["air:algeria:pm10"] = (12.0, expired)
+
+    blocker = asyncio.create_task(client.fetch_air_quality_data("algeria"))
+    await asyncio.sleep(0)
+
+    result = await asyncio.wait_for(
+        client.aggregate_data({"economy": {"asset": "btc"}, "air": {"country": "algeria"}}),
+        timeout=1.0,
+    )
+    assert result == {"economy": {"btc_usd": 100.0}, "air": {"pm10": 12.0}}
+    assert client.bulkheads["open_meteo_air"].rejected == 1
+
+    stall.set()
+    await blocker
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_wait_is_not_upstream_latency():
+    """Time queued for a slot is traced separately from the upstream call itself."""
+    from app.core import tracing
+
+    client = ExternalAPIClient()
+    client.bulkheads["coingecko"] = Bulkhead("coingecko", max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    trace = tracing.start_trace()
+
+    async def hold_slot():
+        async with client._upstream("economy"):
+            await asyncio.sleep(0.1)
+
+    holder = asyncio.create_task(hold_slot())
+    await asyncio.sleep(0)
+    async with client._upstream("economy") as call:
+        assert call.elapsed_ms() < 50
+    await holder
+
+    waits = [duration for name, duration in trace.spans if name == "economy_bulkhead"]
+    assert max(waits) >= 90
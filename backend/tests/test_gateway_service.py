@@ -150,3 +150,99 @@ async def test_aggregate_data_parallel():
     result = await client.aggregate_data(request_data)
     # Should return a dict (may be empty if all APIs fail)
     assert isinstance(result, dict)
+
+
+@pytest.mark.asyncio
+async def test_aggregate_data_field_selection_shares_one_fetch(monkeypatch):
+    """Different field selections for one location are served from a single upstream call."""
+    client = ExternalAPIClient()
+    calls = []
+
+    async def fake_weather(country):
+        calls.append(country)
+        return {"temperature": 21.0, "wind_speed": 4.0, "humidity": 40, "condition": "Clear"}
+
+    monkeypatch.setattr(client, "fetch_weather_data", fake_weather)
+
+    first = await client.aggregate_data({"weather": {"country": "algeria"}})
+    second = await client.aggregate_data(
+        {"weather": {"country": "algeria", "fields": ["humidity", "condition"]}}
+    )
+
+    assert first["weather"] == {"temperature": 21.0, "wind_speed": 4.0}
+    assert second["weather"] == {"humidity": 40, "condition": "Clear"}
+    assert calls == ["algeria"]
+
+
+@pytest.mark.asyncio
+async def test_aggregate_data_ignores_unknown_fields(monkeypatch):
+    """Unknown field names fall back to the section defaults."""
+    client = ExternalAPIClient()
+
+    async def fake_economy(asset):
+        return {"btc_usd": 100.0, "btc_usd_24h_change": 1.5}
+
+    monkeypatch.setattr(client, "fetch_economy_data", fake_economy)
+
+    result = await client.aggregate_data({"economy": {"asset": "btc", "fields": ["bogus"]}})
+    assert result["economy"] == {"btc_usd": 100.0}
+
+
+def test_expiry_follows_upstream_observation_time():
+    """Cache entries expire at the upstream's next expected update, within per-source bounds."""
+    from datetime import datetime, timedelta, timezone
+
+    client = ExternalAPIClient()
+    client.cache_policies["weather"] = (900, 30, 900)
+    observed = (datetime.now(timezone.utc) - timedelta(seconds=100)).isoformat()
+
+    ttl = (client._expiry_for("weather", observed) - datetime.now(timezone.utc)).total_seconds()
+    assert 790 < ttl <= 800
+
+    # Upstream is late with its next update: fall back to the floor
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=2000)).isoformat()
+    ttl = (client._expiry_for("weather", stale) - datetime.now(timezone.utc)).total_seconds()
+    assert 25 < ttl <= 30
+
+
+def test_late_economy_upstream_is_not_polled_faster_than_baseline():
+    """A stale CoinGecko timestamp falls back to a floor no shorter than the flat TTL."""
+    from datetime import datetime, timedelta, timezone
+
+    client = ExternalAPIClient()
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=300)).isoformat()
+
+    ttl = (client._expiry_for("economy", stale) - datetime.now(timezone.utc)).total_seconds()
+    assert ttl > client.cache_duration - 1
+
+
+def test_observation_times_normalize_to_utc():
+    """Open-Meteo GMT times and CoinGecko Unix timestamps both become ISO-8601 UTC."""
+    assert ExternalAPIClient._to_iso("2025-01-01T12:15") == "2025-01-01T12:15:00+00:00"
+    assert ExternalAPIClient._to_iso(0) == "1970-01-01T00:00:00+00:00"
+    assert ExternalAPIClient._to_iso(None) is None
+
+
+@pytest.mark.asyncio
+async def test_state_polling_hints_follow_cache_expiry(monkeypatch):
+    """/state reports when each section changes next and a matching poll interval."""
+    from datetime import datetime, timedelta, timezone
+    from httpx import ASGITransport
+    from app.api import gateway_service
+
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=119.4)
+    cache = gateway_service.api_client._cache
+    monkeypatch.setitem(cache, "weather:algeria:temperature", (20.0, expires_at))
+    monkeypatch.setitem(cache, "weather:algeria:wind_speed", (3.0, expires_at))
+
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/state", json={"weather": {"country": "algeria"}})
+
+    meta = response.json()["_meta"]
+    assert meta["next_update"]["weather"] == expires_at.isoformat()
+    assert 115 < meta["next_update_in"]["weather"] <= 119.4
+    assert datetime.fromisoformat(meta["next_update"]["weather"]).tzinfo is not None
+    # Rounded up, so following the hint does not poll before the entry expires
+    assert meta["poll_interval"] == 120
+    assert response.headers["X-Poll-Interval"] == str(meta["poll_interval"])
@@ -0,0 +1,147 @@
+"""
+Tests for passive upstream health tracking.
+"""
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api import gateway_service
+from app.services.gateway import ExternalAPIClient
+from app.services.health import UpstreamHealth
+
+
+def test_status_from_rolling_outcomes():
+    """Success rate over the window decides healthy / degraded / down."""
+    health = UpstreamHealth(["coingecko"], window=10)
+    assert health.status("coingecko") == "unknown"
+
+    for _ in range(10):
+        health.record("coingecko", True, 50.0)
+    assert health.status("coingecko") == "healthy"
+
+    for _ in range(5):
+        health.record("coingecko", False, 5000.0)
+    assert health.status("coingecko") == "degraded"
+
+    for _ in range(5):
+        health.record("coingecko", False, 5000.0)
+    assert health.status("coingecko") == "down"
+
+
+def test_snapshot_latency_and_last_success():
+    """Snapshots report latency percentiles and the last successful call."""
+    health = UpstreamHealth(["open_meteo_air"])
+    for latency in range(1, 101):
+        health.record("open_meteo_air", True, float(latency))
+
+    details = health.snapshot()["open_meteo_air"]
+    assert details["success_rate"] == 1.0
+    assert details["latency_ms"]["p50"] == 51.0
+    assert details["latency_ms"]["p99"] == 100.0
+    assert details["last_success"] is not None
+
+
+@pytest.mark.asyncio
+async def test_only_idle_providers_are_probed(monkeypatch):
+    """Providers with recent live traffic are not actively probed."""
+    client = ExternalAPIClient()
+    client.health.record("coingecko", True, 10.0)
+    probed = []
+
+    async def fake_fetch(name, data):
+        probed.append(name)
+        return data
+
+    monkeypatch.setattr(client, "fetch_economy_data", lambda _: fake_fetch("coingecko", None))
+    monkeypatch.setattr(
+        client, "fetch_weather_data",
+        lambda _: fake_fetch("open_meteo_weather", {"temperature": 20.0, "wind_speed": 1.0}),
+    )
+    monkeypatch.setattr(
+        client, "fetch_air_quality_data", lambda _: fake_fetch("open_meteo_air", {"pm10": 9.0})
+    )
+
+    await client.probe_idle_providers(idle_after=60)
+    assert sorted(probed) == ["open_meteo_air", "open_meteo_weather"]
+
+    # Probe results warm the cache, so a repeat probe makes no upstream call
+    assert client._cache["air:algeria:pm10"][0] == 9.0
+    await client.probe_idle_providers(idle_after=60)
+    assert len(probed) == 2
+
+
+@pytest.mark.asyncio
+async def test_probes_leave_request_cache_flag_alone(monkeypatch):
+    """A background probe does not flip the cached flag of an in-flight request."""
+    client = ExternalAPIClient()
+
+    async def fake_fetch(identifier):
+        return {"pm10": 9.0}
+
+    for fetcher in ("fetch_economy_data", "fetch_weather_data", "fetch_air_quality_data"):
+        monkeypatch.setattr(client, fetcher, fake_fetch)
+    client._last_was_cached = True
+    await client.probe_idle_providers(idle_after=60)
+
+    assert client._cache["air:algeria:pm10"][0] == 9.0
+    assert client._last_was_cached is True
+
+
+@pytest.mark.asyncio
+async def test_external_health_answers_from_memory(monkeypatch):
+    """/health/external reports recorded outcomes without calling upstreams."""
+    health = UpstreamHealth(["coingecko", "open_meteo_weather"])
+    health.record("coingecko", True, 12.0)
+    health.record("open_meteo_weather", False, 900.0)
+    monkeypatch.setattr(gateway_service.api_client, "health", health)
+
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/health/external")
+
+    data = response.json()
+    assert data["services"] == {"coingecko": "healthy", "open_meteo_weather": "down"}
+    assert data["status"] == "degraded"
+    assert data["details"]["coingecko"]["latency_ms"]["p50"] == 12.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "payload, ok",
+    [
+        ({"current": {"time": "2025-01-01T12:00", "pm10": 10.0}}, True),
+        ({"current": {"time": "not-a-time", "pm10": 10.0}}, False),
+        ({"error": False}, False),
+    ],
+)
+async def test_each_fetch_records_one_outcome(payload, ok):
+    """A fetch records a single outcome, and only usable data counts as success."""
+    import httpx
+
+    client = ExternalAPIClient()
+    client._http_clients["open_meteo_air"] = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+    )
+
+    result = await client.fetch_air_quality_data("algeria")
+    await client.aclose()
+
+    outcomes = list(client.health._stats["open_meteo_air"].outcomes)
+    assert len(outcomes) == 1
+    assert outcomes[0][0] is ok
+    assert (result is not None) is ok
+
+
+@pytest.mark.asyncio
+async def test_external_health_ignores_providers_without_samples(monkeypatch):
+    """Providers that have not been called yet do not make the gateway look degraded."""
+    health = UpstreamHealth(["coingecko", "open_meteo_air"])
+    monkeypatch.setattr(gateway_service.api_client, "health", health)
+
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/health/external")).json()["status"] == "unknown"
+        health.record("coingecko", True, 10.0)
+        data = (await client.get("/health/external")).json()
+
+    assert data["status"] == "all systems operational"
+    assert data["services"]["open_meteo_air"] == "unknown"
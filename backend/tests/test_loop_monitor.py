@@ -0,0 +1,55 @@
+"""
+Tests for event-loop lag monitoring.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.core.loop_monitor import EventLoopMonitor
+
+
+def test_lag_histogram_and_percentiles():
+    """Lag samples land in the right buckets and drive the percentiles."""
+    monitor = EventLoopMonitor()
+    for _ in range(99):
+        monitor.record_lag(0.5)
+    monitor.record_lag(300.0)
+
+    snapshot = monitor.snapshot()
+    assert snapshot["lag_ms"]["histogram"]["<=1ms"] == 99
+    assert snapshot["lag_ms"]["histogram"]["<=500ms"] == 1
+    assert snapshot["lag_ms"]["p50"] == 1.0
+    assert snapshot["lag_ms"]["max"] == 300.0
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_detected():
+    """A callback that blocks the loop is measured as lag and reported as slow."""
+    monitor = EventLoopMonitor(interval=0.01, slow_threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # block the loop
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert monitor.max_lag_ms >= 100
+    assert monitor.slow_callbacks >= 1
+    assert monitor.max_tasks >= 1
+
+
+@pytest.mark.asyncio
+async def test_block_just_over_threshold_is_reported():
+    """With default settings, a block slightly longer than the threshold is logged once."""
+    for _ in range(3):
+        monitor = EventLoopMonitor()
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            time.sleep(monitor.slow_threshold + 0.05)  # block the loop
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+        assert monitor.slow_callbacks == 1
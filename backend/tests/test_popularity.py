@@ -0,0 +1,53 @@
+"""
+Tests for bounded-memory popularity tracking.
+"""
+from app.core.popularity import PopularityTracker
+
+
+def test_top_keys_ranked_by_count():
+    """Heavy hitters are reported in order with their counts."""
+    tracker = PopularityTracker(half_life=1e9)
+    for _ in range(5):
+        tracker.add("btc", now=0.0)
+    for _ in range(2):
+        tracker.add("eth", now=0.0)
+    tracker.add("sol", now=0.0)
+
+    top = tracker.top(2, now=0.0)
+    assert [key for key, _ in top] == ["btc", "eth"]
+    assert round(top[0][1]) == 5
+    assert round(tracker.estimate("BTC", now=0.0)) == 5
+
+
+def test_memory_stays_bounded_under_random_keys():
+    """Distinct junk keys do not grow the tracked key set."""
+    tracker = PopularityTracker(width=1024, depth=4, top_k=3, half_life=1e9)
+    for _ in range(50):
+        tracker.add("btc", now=0.0)
+    for i in range(5000):
+        tracker.add(f"junk-{i}", now=0.0)
+
+    assert len(tracker._top) == 3
+    assert tracker.top(1, now=0.0)[0][0] == "btc"
+
+
+def test_counts_decay_over_time():
+    """A hit's weight halves every half-life."""
+    tracker = PopularityTracker(half_life=10.0)
+    tracker._landmark = 0.0
+    for _ in range(8):
+        tracker.add("algeria", now=0.0)
+
+    assert round(tracker.estimate("algeria", now=10.0)) == 4
+    assert round(tracker.estimate("algeria", now=30.0)) == 1
+
+
+def test_rescale_preserves_estimates():
+    """Moving the decay landmark keeps decayed counts unchanged."""
+    tracker = PopularityTracker(half_life=1.0)
+    tracker._landmark = 0.0
+    tracker.add("usa", now=0.0)
+    tracker.add("usa", now=50.0)  # weight 2**50 > threshold triggers a rescale
+
+    assert tracker._landmark == 50.0
+    assert abs(tracker.estimate("usa", now=50.0) - 1.0) < 1e-6
@@ -0,0 +1,72 @@
+"""
+Tests for request phase tracing and the on-demand profiler.
+"""
+import asyncio
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.api import gateway_service
+from app.core import tracing
+from app.core.profiler import sample_stacks
+
+
+def test_spans_render_server_timing():
+    """Spans recorded under a trace appear in the Server-Timing value."""
+    trace = tracing.start_trace()
+    with tracing.span("cache"):
+        pass
+    header = trace.server_timing()
+    assert header.startswith("cache;dur=")
+    assert "total;dur=" in header
+    assert "cache" in tracing.phase_summary()
+
+
+@pytest.mark.asyncio
+async def test_state_returns_server_timing_header():
+    """/state responses carry per-phase timings."""
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/state", json={"economy": {"asset": "invalid_asset"}})
+    assert response.status_code == 200
+    header = response.headers["Server-Timing"]
+    for phase in ("ratelimit", "validate", "admission", "cache", "serialize", "total"):
+        assert f"{phase};dur=" in header
+
+
+@pytest.mark.asyncio
+async def test_debug_profile_disabled_without_token():
+    """The profiler endpoint is hidden unless a debug token is configured."""
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/debug/profile", params={"seconds": 0.1})
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_sample_stacks_folded_output():
+    """Profiler output is one 'stack count' line per distinct stack."""
+    folded = await asyncio.to_thread(sample_stacks, 0.05, 0.005)
+    lines = folded.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert ";" in stack
+
+
+@pytest.mark.asyncio
+async def test_debug_profile_requires_matching_token(monkeypatch):
+    """With a token configured, only requests carrying it can run the profiler."""
+    monkeypatch.setattr(gateway_service.settings, "DEBUG_PROFILE_TOKEN", "s3cret")
+    transport = ASGITransport(app=gateway_service.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        denied = await client.get("/debug/profile", params={"seconds": 0.1})
+        wrong = await client.get(
+            "/debug/profile", params={"seconds": 0.1}, headers={"X-Debug-Token": "nope"}
+        )
+        allowed = await client.get(
+            "/debug/profile", params={"seconds": 0.1}, headers={"X-Debug-Token": "s3cret"}
+        )
+    assert denied.status_code == 403
+    assert wrong.status_code == 403
+    assert allowed.status_code == 200
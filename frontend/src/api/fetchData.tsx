@@ -4,6 +4,8 @@ import type { WorldData } from "../types/game"
 const countries = ["Algeria", "France", "USA", "Germany", "Japan"]
 const assets = ["btc", "eth", "ltc"]
 const API_URL = import.meta.env.VITE_API_URL;
+// Fields the game uses - the gateway serves all of them from one upstream call
+const weatherFields = ["temperature", "wind_speed", "humidity", "condition"]
 
 const mapAirQuality = (air: any) => {
   if (!air) return { aqi: 50, level: "Unknown" }
@@ -33,7 +35,7 @@ export const fetchWorldData = async (): Promise<WorldData> => {
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
         economy: { asset: randomAsset },
-        weather: { country: randomWeatherCountry },
+        weather: { country: randomWeatherCountry, fields: weatherFields },
         air: { country: randomAirCountry }
       })
     })
@@ -43,10 +45,14 @@ export const fetchWorldData = async (): Promise<WorldData> => {
     }
 
     const data = await response.json()
+    // Keep only the weather fields the gateway actually has values for
+    const weather = Object.fromEntries(
+      Object.entries(data.weather ?? {}).filter(([, value]) => value != null)
+    )
 
     return {
       economyMultiplier: data.economy?.[randomAsset + "_usd"] ? data.economy[randomAsset + "_usd"] / 10000 : 1.0,
-      weather: data.weather ?? { temperature: 20, wind_speed: 0, condition: "Unknown", humidity: 50},
+      weather: { temperature: 20, wind_speed: 0, condition: "Unknown", humidity: 50, ...weather },
       airQuality: mapAirQuality(data.air)
     }
   } catch (err) {